@@ -4,26 +4,55 @@ import numpy as np
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import hashlib
+import functools
+import queue
 import json
+import logging
+import requests
 from web3 import Web3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import threading
 import time
 import uuid
+from collections import OrderedDict
 
 # Custom modules
 from csv_validator import validate_uploaded_csv
+from data_utils import (
+    available_years, categorize_columns, downcast_frame, format_metric_label, parquet_cache_path,
+    read_csv_arrow, slice_date_range, sort_by_date, top_totals
+)
 from exceptions import CSVValidationError
 from field_detector import detect_fields, validate_and_clean_data
 
 # Enhanced ML forecasting module
 from ml.forecast import generate_ml_forecast
+from ml.rfm import calculate_rfm
 
 # SUI Blockchain adapter
-from suiblockchain import log_forecast_to_sui
+from suiblockchain import get_sui_adapter, log_forecast_to_sui
+
+# Per-request dashboard progress goes through logging (one record per banner);
+# LOG_LEVEL=WARNING skips building those messages entirely
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+# Copy-on-Write: date-range slices and other views of the cached frames share
+# memory instead of copying, and can never write back into the cache
+# (always on from pandas 3.0, where the option is deprecated)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 app = Flask(__name__)
 
+# Serialize jsonify() responses with orjson when it is installed
+try:
+    from json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
+except ImportError:
+    print("⚠️ orjson not installed, using the default JSON encoder")
+
 # FIXED SEC-004: Restrict CORS to specific origins
 ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000,http://localhost:5173').split(',')
 CORS(app, resources={r"/api/*": {"origins": ALLOWED_ORIGINS}})
@@ -35,6 +64,14 @@ CORS(app, resources={r"/api/*": {"origins": ALLOWED_ORIGINS}})
 GANACHE_URL = os.getenv('BLOCKCHAIN_URL', "http://127.0.0.1:8545")
 CONTRACT_ADDRESS_FILE = "contract_address.txt"
 
+# Shared Web3 client: one keep-alive HTTP session for every Ganache RPC.
+# The pool is sized for gunicorn's request threads plus the tx queue thread.
+_rpc_session = requests.Session()
+_rpc_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+_rpc_session.mount('http://', _rpc_adapter)
+_rpc_session.mount('https://', _rpc_adapter)
+W3 = Web3(Web3.HTTPProvider(GANACHE_URL, session=_rpc_session, request_kwargs={'timeout': 10}))
+
 # CSV Upload Configuration
 UPLOAD_FOLDER = 'uploads'
 DEFAULT_CSV = None
@@ -43,7 +80,20 @@ CURRENT_MAPPING = {}
 
 # FIXED SEC-002: File upload security
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB limit
+UPLOAD_CHUNK_SIZE = 1 << 20  # Uploads are copied to disk 1MB at a time
 ALLOWED_EXTENSIONS = {'csv', 'txt'}
+REQUIRED_FIELDS = ('date', 'value')  # Mapping keys an upload needs before it can be analyzed
+
+# Cap on the whole request body (file plus multipart headers). Werkzeug
+# checks it against Content-Length before parsing, so oversize uploads are
+# refused before anything is spooled to disk.
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 64 * 1024
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({
+        'error': f'File too large. Maximum size: {MAX_FILE_SIZE/1024/1024:.0f}MB'
+    }), 413
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -57,13 +107,65 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # ==========================================
 data_cache = {}
 
+# Dashboard analytics per (dataset fingerprint, from, to, horizon), LRU-bounded.
+# Keyed on the CSV's path/mtime/size and mapping rather than the DataFrame
+# object, so entries survive data_cache.clear() on page load but not a
+# re-upload or mapping change.
+ANALYTICS_CACHE_SIZE = 32
+analytics_cache = OrderedDict()
+# gunicorn runs several request threads per worker (--threads)
+_analytics_lock = threading.Lock()
+
+# Shared by all dashboard requests instead of a pool per request. Threads are
+# spawned on first submit, so a pool created under gunicorn --preload is safe
+# to use after the fork into workers.
+ANALYTICS_WORKERS = 8
+_analytics_pool = ThreadPoolExecutor(max_workers=ANALYTICS_WORKERS, thread_name_prefix='analytics')
+
+
+def _get_cached_analytics(key):
+    with _analytics_lock:
+        if key not in analytics_cache:
+            return None
+        analytics_cache.move_to_end(key)
+        return analytics_cache[key]
 
-def _format_metric_label(column_name):
-    """Convert raw column name to a human-friendly label"""
-    if not column_name:
-        return "Metric"
-    label = column_name.replace("_", " ").replace("-", " ").strip()
-    return label.title() if label else "Metric"
+
+def _store_analytics(key, results):
+    with _analytics_lock:
+        analytics_cache[key] = results
+        analytics_cache.move_to_end(key)
+        while len(analytics_cache) > ANALYTICS_CACHE_SIZE:
+            analytics_cache.popitem(last=False)
+
+
+def _resolve_csv_path(csv_filename):
+    """Uploads folder first, then the working directory; None if missing"""
+    if os.path.exists(os.path.join(UPLOAD_FOLDER, csv_filename)):
+        return os.path.join(UPLOAD_FOLDER, csv_filename)
+    if os.path.exists(csv_filename):
+        return csv_filename
+    return None
+
+
+def _data_fingerprint():
+    """Identifies the current dataset + mapping; changes whenever analytics would"""
+    csv_path = _resolve_csv_path(CURRENT_CSV_FILE) if CURRENT_CSV_FILE else None
+    if csv_path is None:
+        return None
+    stat = os.stat(csv_path)
+    return (csv_path, stat.st_mtime_ns, stat.st_size, json.dumps(CURRENT_MAPPING, sort_keys=True))
+
+
+def _count_weeks(dates):
+    """Distinct Monday-Sunday weeks in sorted dates (same weeks as dt.to_period('W'))"""
+    if len(dates) == 0:
+        return 0
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    weeks = (days + 3) // 7  # 1970-01-01 was a Thursday
+    return int(np.count_nonzero(np.diff(weeks))) + 1
 
 
 def load_data(csv_filename=None):
@@ -92,19 +194,43 @@ def load_data(csv_filename=None):
     print(f"Loading dataset: {csv_filename}...")
     try:
         # Determine file path (check uploads folder first, then root)
-        if os.path.exists(os.path.join(UPLOAD_FOLDER, csv_filename)):
-            csv_path = os.path.join(UPLOAD_FOLDER, csv_filename)
-        elif os.path.exists(csv_filename):
-            csv_path = csv_filename
-        else:
+        csv_path = _resolve_csv_path(csv_filename)
+        if csv_path is None:
             print(f"❌ CSV file not found: {csv_filename}")
             return None
-        
+
+        # Reuse the cleaned Parquet sidecar if it is newer than the CSV
+        parquet_path = parquet_cache_path(csv_path, mapping_key)
+        if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            try:
+                df = categorize_columns(sort_by_date(pd.read_parquet(parquet_path, memory_map=True)), ('CustomerID',))
+                data_cache[cache_key] = df
+                print(f"✅ Loaded {len(df)} transactions from Parquet cache")
+                return df
+            except Exception as e:
+                print(f"⚠️  Parquet cache unreadable, re-parsing CSV: {e}")
+
+        # Only parse the columns the mapping uses (plus InvoiceNo if the file has one)
+        wanted = None
+        if CURRENT_MAPPING:
+            wanted = {col for key, col in CURRENT_MAPPING.items()
+                      if key in ('date', 'value', 'product', 'region', 'customer') and col and col != 'none'}
+            wanted.add('InvoiceNo')
+
         # Try multiple encodings
         df = None
         for encoding in ['ISO-8859-1', 'utf-8', 'cp1252']:
             try:
-                df = pd.read_csv(csv_path, encoding=encoding)
+                header = pd.read_csv(csv_path, encoding=encoding, nrows=0).columns
+                usecols = None
+                if wanted is not None:
+                    usecols = [col for col in header if col in wanted]
+                try:
+                    df = read_csv_arrow(csv_path, encoding, usecols).to_pandas()
+                except (ImportError, ValueError) as e:
+                    # pyarrow missing, or a column it can't type consistently
+                    print(f"⚠️  pyarrow CSV reader failed, using default parser: {e}")
+                    df = pd.read_csv(csv_path, encoding=encoding, usecols=usecols)
                 break
             except UnicodeDecodeError:
                 continue
@@ -143,8 +269,9 @@ def load_data(csv_filename=None):
             df = df.rename(columns=rename_map)
             
         # Ensure InvoiceNo exists (needed for RFM frequency)
+        # Integer row ids: RFM only counts non-null values, so no per-row str objects
         if 'InvoiceNo' not in df.columns:
-            df['InvoiceNo'] = df.index.astype(str)
+            df['InvoiceNo'] = np.arange(len(df), dtype=np.int64)
 
         # Cleaning
         df['TotalAmount'] = pd.to_numeric(df['TotalAmount'], errors='coerce').fillna(0)
@@ -155,7 +282,24 @@ def load_data(csv_filename=None):
         if df.empty:
             print("❌ No valid date data after cleaning!")
             return None
-        
+
+        df = sort_by_date(df)
+        df = categorize_columns(df, ('CustomerID',))
+        df = downcast_frame(df)
+
+        # Persist cleaned frame so the next cold start skips CSV parsing.
+        # Written to a temp file and renamed, so other gunicorn workers
+        # never read a half-written sidecar.
+        tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp_path, compression='zstd')
+            os.replace(tmp_path, parquet_path)
+        except Exception as e:
+            # pyarrow missing or a mixed-type column Parquet can't store
+            print(f"⚠️  Skipping Parquet cache: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
         data_cache[cache_key] = df
         print(f"✅ Loaded {len(df)} transactions from {csv_filename}")
         return df
@@ -174,6 +318,18 @@ def load_data(csv_filename=None):
 # - Robust confidence flags
 # See ml/forecast.py for implementation details
 
+def _period_change(window, is_current, column):
+    """Per-key TotalAmount change (current - previous) from one groupby over both periods"""
+    sums = (
+        window.groupby([window[column], is_current.rename('_current')], observed=True, sort=False)['TotalAmount']
+        .sum()
+        .unstack('_current')
+        .reindex(columns=[False, True])
+    )
+    # Keys with no current-period sales stay NaN, so idxmax/idxmin skip them
+    return sums[True] - sums[False].fillna(0)
+
+
 def analyze_root_cause(df):
     """
     Analyze WHY sales changed.
@@ -182,13 +338,20 @@ def analyze_root_cause(df):
     """
     try:
         # 1. Setup Dates
-        last_date = df['InvoiceDate'].max()
+        df = sort_by_date(df)
+        dates = df['InvoiceDate']
+        last_date = dates.max()
         cutoff_current = last_date - timedelta(days=28)
         cutoff_previous = cutoff_current - timedelta(days=28)
         
-        # 2. Split Data
-        current_period = df[df['InvoiceDate'] > cutoff_current]
-        previous_period = df[(df['InvoiceDate'] <= cutoff_current) & (df['InvoiceDate'] > cutoff_previous)]
+        # 2. Split Data: positional slices of the date-sorted frame (no boolean masks);
+        # both periods share one window, tagged per row
+        start = dates.searchsorted(cutoff_previous, side='right')
+        split = dates.searchsorted(cutoff_current, side='right')
+        window = df.iloc[start:]
+        current_period = df.iloc[split:]
+        previous_period = df.iloc[start:split]
+        is_current = pd.Series(np.arange(len(window)) >= split - start, index=window.index)
         
         if current_period.empty or previous_period.empty:
             return {
@@ -225,9 +388,7 @@ def analyze_root_cause(df):
         
         if has_products and distinct_products >= 2:
             try:
-                prod_curr = current_period.groupby('Description')['TotalAmount'].sum()
-                prod_prev = previous_period.groupby('Description')['TotalAmount'].sum()
-                prod_change = (prod_curr - prod_prev).fillna(prod_curr)
+                prod_change = _period_change(window, is_current, 'Description')
                 
                 if not prod_change.empty:
                     top_gainer_val = prod_change.idxmax()
@@ -244,9 +405,7 @@ def analyze_root_cause(df):
         top_country_change = 'N/A'
         if has_countries and distinct_countries >= 2:
             try:
-                country_curr = current_period.groupby('Country')['TotalAmount'].sum()
-                country_prev = previous_period.groupby('Country')['TotalAmount'].sum()
-                country_change = (country_curr - country_prev).fillna(country_curr)
+                country_change = _period_change(window, is_current, 'Country')
                 
                 if not country_change.empty:
                     top_country_val = country_change.idxmax()
@@ -296,95 +455,45 @@ def get_top_stats(df):
     products_data = []
 
     if 'Country' in df.columns:
-        countries = df.groupby('Country')['TotalAmount'].sum().sort_values(ascending=False).head(5)
-        countries_data = [{'country': c, 'value': round(s, 2)} for c, s in countries.items()]
+        countries_data = top_totals(df, 'Country', 'country')
 
     if 'Description' in df.columns:
-        products = df.groupby('Description')['TotalAmount'].sum().sort_values(ascending=False).head(5)
-        products_data = [{'product': p, 'value': round(q, 2)} for p, q in products.items()]
+        products_data = top_totals(df, 'Description', 'product')
 
     return countries_data, products_data
 
-def calculate_rfm(df, has_customer_dimension=True):
-    """Calculate RFM Segments"""
-    if not has_customer_dimension or 'CustomerID' not in df.columns:
-        return {
-            'available': False,
-            'segmentCounts': {},
-            'topCustomers': []
-        }
+def _cached_rfm(df_filtered, fingerprint, from_date, to_date, has_customer_dimension):
+    """
+    RFM for a date range, kept in the analytics LRU.
+    RFM does not depend on the forecast horizon, so every horizon reuses it.
+    """
+    if fingerprint is None:
+        return calculate_rfm(df_filtered, has_customer_dimension=has_customer_dimension)
+    key = ('rfm', fingerprint, from_date or '', to_date or '', has_customer_dimension)
+    rfm = _get_cached_analytics(key)
+    if rfm is None:
+        rfm = calculate_rfm(df_filtered, has_customer_dimension=has_customer_dimension)
+        _store_analytics(key, rfm)
+    return rfm
+
+
+def _cached_total(fingerprint, from_date, to_date, get_rows):
+    """
+    TotalAmount over a date range, kept in the analytics LRU so /api/reconcile
+    reuses the dashboard's KPI total. get_rows() only runs on a miss and may
+    return None (no data), in which case None is returned.
+    """
+    key = ('total', fingerprint, from_date or '', to_date or '')
+    total = _get_cached_analytics(key) if fingerprint else None
+    if total is None:
+        rows = get_rows()
+        if rows is None:
+            return None
+        total = float(rows['TotalAmount'].sum())
+        if fingerprint:
+            _store_analytics(key, total)
+    return total
 
-    # Calculate RFM metrics
-    current_date = df['InvoiceDate'].max()
-    
-    rfm = df.groupby('CustomerID').agg({
-        'InvoiceDate': lambda x: (current_date - x.max()).days,
-        'InvoiceNo': 'count',
-        'TotalAmount': 'sum'
-    }).rename(columns={
-        'InvoiceDate': 'Recency',
-        'InvoiceNo': 'Frequency',
-        'TotalAmount': 'Monetary'
-    })
-    
-    # Score RFM (1-5 scale)
-    try:
-        rfm['R_Score'] = pd.qcut(rfm['Recency'], 5, labels=[5, 4, 3, 2, 1])
-        rfm['F_Score'] = pd.qcut(rfm['Frequency'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5])
-        rfm['M_Score'] = pd.qcut(rfm['Monetary'], 5, labels=[1, 2, 3, 4, 5])
-    except Exception:
-        # Fallback for small datasets
-        return {
-            'available': True,
-            'segmentCounts': {},
-            'topCustomers': []
-        }
-    
-    rfm['RFM_Score'] = rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str) + rfm['M_Score'].astype(str)
-    
-    # Define Segments
-    def segment_customer(row):
-        r, f, m = int(row['R_Score']), int(row['F_Score']), int(row['M_Score'])
-        if r >= 5 and f >= 5 and m >= 5: return 'Champions'
-        if r >= 3 and f >= 4 and m >= 4: return 'Loyal Customers'
-        if r >= 4 and f <= 2: return 'New Customers'
-        if r <= 2 and f >= 4: return 'At Risk'
-        if r <= 2 and f <= 2: return 'Lost'
-        return 'Regular'
-    
-    rfm['Segment'] = rfm.apply(segment_customer, axis=1)
-    
-    # Get Segment Counts
-    segment_counts = rfm['Segment'].value_counts().to_dict()
-    
-    # Get Top Customers with Offers
-    top_customers = rfm.sort_values('Monetary', ascending=False).head(5).reset_index()
-    
-    def get_offer(segment):
-        offers = {
-            'Champions': 'VIP Access + 20% Off',
-            'Loyal Customers': 'Double Points',
-            'New Customers': 'Welcome Gift',
-            'At Risk': 'We Miss You - 10% Off',
-            'Lost': 'Win Back - 15% Off',
-            'Regular': 'Free Shipping'
-        }
-        return offers.get(segment, 'Standard Offer')
-    
-    customers_list = []
-    for _, row in top_customers.iterrows():
-        customers_list.append({
-            'id': str(row['CustomerID']),
-            'amount': round(row['Monetary'], 2),
-            'segment': row['Segment'],
-            'offer': get_offer(row['Segment'])
-        })
-        
-    return {
-        'available': True,
-        'segmentCounts': segment_counts,
-        'topCustomers': customers_list
-    }
 
 # ==========================================
 # 🚀 API ENDPOINTS
@@ -410,15 +519,6 @@ def upload_csv():
     if not safe_filename_str:
         return jsonify({'error': 'Invalid filename'}), 400
     
-    # FIXED SEC-002: Check file size
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({
-            'error': f'File too large. Maximum size: {MAX_FILE_SIZE/1024/1024:.0f}MB'
-        }), 413
-    
     # Use UUID to avoid filename conflicts
     storage_filename = f"{uuid.uuid4().hex}_{safe_filename_str}"
     filepath = os.path.join(UPLOAD_FOLDER, storage_filename)
@@ -429,9 +529,24 @@ def upload_csv():
     if not abs_filepath.startswith(abs_upload):
         return jsonify({'error': 'Invalid file path'}), 400
     
+    # FIXED SEC-002: Stream to disk in 1 MB chunks, enforcing the size limit as we go
+    # (only one chunk is ever held in memory, and the size falls out of the copy)
+    file_size = 0
+    with open(filepath, 'wb') as out:
+        while chunk := file.stream.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_FILE_SIZE:
+                break
+            out.write(chunk)
+    if file_size > MAX_FILE_SIZE:
+        os.remove(filepath)
+        return jsonify({
+            'error': f'File too large. Maximum size: {MAX_FILE_SIZE/1024/1024:.0f}MB'
+        }), 413
+    
     try:
-        # Validate and load CSV
-        df = validate_uploaded_csv(file, filepath)
+        # Validate and load CSV from the saved copy
+        df = validate_uploaded_csv(filepath)
         
         # 🔍 AUTO-DETECT FIELDS
         detection = detect_fields(df)
@@ -441,11 +556,7 @@ def upload_csv():
         warnings = detection['warnings']
         
         # Check if required fields were detected
-        missing_required = []
-        if not mapping.get('date'):
-            missing_required.append('date')
-        if not mapping.get('value'):
-            missing_required.append('value')
+        missing_required = [field for field in REQUIRED_FIELDS if not mapping.get(field)]
         
         # Update global state with storage filename
         CURRENT_CSV_FILE = storage_filename
@@ -456,13 +567,15 @@ def upload_csv():
             CURRENT_MAPPING = mapping
             
             # Clean and validate data
-            df_clean, clean_warnings = validate_and_clean_data(df, mapping)
-            warnings.extend(clean_warnings)
+            df_clean = validate_and_clean_data(df, mapping)
+            dropped_rows = len(df) - len(df_clean)
+            if dropped_rows:
+                warnings.append(f"{dropped_rows} rows with an invalid date or value will be skipped")
             
             return jsonify({
                 'success': True,
                 'message': 'File uploaded and fields auto-detected!',
-                'filename': filename,
+                'filename': storage_filename,
                 'mapping': mapping,
                 'confidence': confidence,
                 'warnings': warnings,
@@ -477,12 +590,29 @@ def upload_csv():
             return jsonify({
                 'success': True,
                 'message': 'Please confirm or adjust field mapping',
-                'filename': filename,
+                'filename': storage_filename,
                 'columns': df.columns.tolist(),
                 'suggested_mapping': mapping,
                 'confidence': confidence,
                 'confidence_scores': detection['confidence_scores'],
                 'warnings': warnings,
+                'missing_required': missing_required,
+                'requires_mapping': True,
+                'auto_detected': False
+            })
+    
+    except CSVValidationError as e:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"Upload Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Upload failed: {str(e)}'}), 500
+
+@app.route('/api/save-mapping', methods=['POST'])
+def save_mapping():
     global CURRENT_MAPPING, data_cache
     
     try:
@@ -516,15 +646,10 @@ def get_dashboard():
         from_date = request.args.get('from')
         to_date = request.args.get('to')
         
-        # Apply date filter BEFORE any analytics
-        df_filtered = df.copy()
+        # Apply date filter BEFORE any analytics (binary search on the date-sorted frame)
+        df_filtered = df
         if from_date or to_date:
-            if from_date:
-                from_dt = pd.to_datetime(from_date)
-                df_filtered = df_filtered[df_filtered['InvoiceDate'] >= from_dt]
-            if to_date:
-                to_dt = pd.to_datetime(to_date)
-                df_filtered = df_filtered[df_filtered['InvoiceDate'] <= to_dt]
+            df_filtered = slice_date_range(df, from_date, to_date)
                 
             if df_filtered.empty:
                  return jsonify({'success': False, 'error': 'No data available for selected date range'}), 400
@@ -548,49 +673,59 @@ def get_dashboard():
             }), 400
 
         # 1. Generate Forecast (with enhanced logging)
-        print(f"\n{'='*80}")
-        print(f"🚀 Generating forecast for {len(df_filtered)} transactions")
-        print(f"   Date range: {df_filtered['InvoiceDate'].min()} to {df_filtered['InvoiceDate'].max()}")
-        print(f"   Horizon: {horizon} weeks")
-        print(f"{'='*80}\n")
-        
-        forecast = generate_ml_forecast(df_filtered, horizon=horizon)
+        if logger.isEnabledFor(logging.INFO):
+            # df_filtered is date-sorted: first/last rows are the range bounds
+            logger.info('\n'.join([
+                '=' * 80,
+                f"🚀 Generating forecast for {len(df_filtered)} transactions",
+                f"   Date range: {df_filtered['InvoiceDate'].iloc[0]} to {df_filtered['InvoiceDate'].iloc[-1]}",
+                f"   Horizon: {horizon} weeks",
+                '=' * 80
+            ]))
         
-        # 2. Calculate RFM (on filtered data)
         has_customer_dimension = 'CustomerID' in df_filtered.columns and bool(CURRENT_MAPPING.get('customer')) and CURRENT_MAPPING.get('customer') != 'none'
-        rfm = calculate_rfm(df_filtered, has_customer_dimension=has_customer_dimension)
-        
-        # 3. Get Top Stats (on filtered data)
-        countries, products = get_top_stats(df_filtered)
-        
-        # 4. Log to SUI Blockchain and generate hash
-        print(f"\n{'='*80}")
-        print(f"⛓️  Logging forecast to SUI Testnet...")
-        print(f"{'='*80}\n")
-        
-        blockchain_result = log_forecast_to_sui(forecast, forecast['totalForecast'])
-        forecast_hash = blockchain_result['hash']
-        tx_hash = blockchain_result.get('tx_hash', 'Unavailable')
-        
-        if blockchain_result['success']:
-            print(f"✅ Forecast logged to blockchain successfully")
-            print(f"   Hash: {forecast_hash[:16]}...")
-            print(f"   TX: {tx_hash[:16]}...")
-        else:
-            print(f"⚠️  Blockchain logging failed: {blockchain_result['message']}")
-            print(f"   Hash stored locally: {forecast_hash[:16]}...")
-        
-        # 5. Root Cause Analysis (on filtered data)
-        root_cause = analyze_root_cause(df_filtered)
-        
-        # 6. Available Years (from FULL dataset, not filtered)
-        date_col = CURRENT_MAPPING.get('date', 'InvoiceDate')
-        if date_col in df.columns:
-            years = sorted(df[date_col].dt.year.unique().tolist(), reverse=True)
+
+        # Repeat filters (refreshes, polling, page reloads) reuse the previous analytics
+        fingerprint = _data_fingerprint()
+        analytics_key = ('dashboard', fingerprint, from_date or '', to_date or '', horizon, has_customer_dimension)
+        cached = _get_cached_analytics(analytics_key) if fingerprint else None
+        if cached is not None:
+            logger.info("✅ Using cached analytics for this date range")
+            forecast, rfm, countries, products, root_cause, forecast_hash = cached
         else:
-            years = []
+            # Forecast, RFM, top stats and root cause only read df_filtered,
+            # so run them side by side (model fits and NumPy release the GIL)
+            forecast_future = _analytics_pool.submit(generate_ml_forecast, df_filtered, horizon=horizon)
+            # 2. Calculate RFM (on filtered data)
+            rfm_future = _analytics_pool.submit(_cached_rfm, df_filtered, fingerprint, from_date, to_date, has_customer_dimension)
+            # 3. Get Top Stats (on filtered data)
+            stats_future = _analytics_pool.submit(get_top_stats, df_filtered)
+            # 5. Root Cause Analysis (on filtered data)
+            root_cause_future = _analytics_pool.submit(analyze_root_cause, df_filtered)
 
-        metric_label = _format_metric_label(CURRENT_MAPPING.get('value'))
+            forecast = forecast_future.result()
+            rfm = rfm_future.result()
+            countries, products = stats_future.result()
+            root_cause = root_cause_future.result()
+
+            # Hash once per computed forecast; cache hits reuse it
+            forecast_hash = get_sui_adapter().generate_forecast_hash(forecast)
+            if fingerprint:
+                _store_analytics(analytics_key, (forecast, rfm, countries, products, root_cause, forecast_hash))
+        
+        # 4. Log to SUI Blockchain in the background; the response carries the
+        # hash now and /api/tx-status/<hash> reports the transaction later
+        logger.info("⛓️  Logging forecast to SUI Testnet (background)...")
+        
+        sui_job = _submit_sui_log(forecast, forecast_hash)
+        tx_hash = 'Pending...'
+        if sui_job.done() and not sui_job.exception():
+            tx_hash = sui_job.result().get('tx_hash', 'Unavailable')
+        
+        # 6. Available Years (from FULL dataset, not filtered), newest first
+        years = available_years(df)[::-1]
+
+        metric_label = format_metric_label(CURRENT_MAPPING.get('value'))
 
         capabilities = {
             'hasProducts': 'Description' in df_filtered.columns,
@@ -601,23 +736,21 @@ def get_dashboard():
         # ==========================================
         # 🆕 PHASE 1: Calculate KPIs
         # ==========================================
-        value_col = CURRENT_MAPPING.get('value', 'Quantity')
-        date_col = CURRENT_MAPPING.get('date', 'InvoiceDate')
-        
+        # load_data renames the mapped columns to TotalAmount/InvoiceDate
         # Total value in current date range
-        total_value = df_filtered[value_col].sum()
+        total_value = _cached_total(fingerprint, from_date, to_date, lambda: df_filtered)
         
         # Growth % vs previous equal period
         if from_date and to_date:
-            # Calculate period length
-            period_days = (pd.to_datetime(to_date) - pd.to_datetime(from_date)).days
+            # Calculate period length (both end days are included)
+            period_days = (pd.to_datetime(to_date) - pd.to_datetime(from_date)).days + 1
             
-            # Get previous period
+            # Get previous period: [prev_from, prev_to) by binary search on the sorted dates
             prev_from = pd.to_datetime(from_date) - timedelta(days=period_days)
             prev_to = pd.to_datetime(from_date)
             
-            df_previous = df[(df[date_col] >= prev_from) & (df[date_col] < prev_to)]
-            prev_value = df_previous[value_col].sum()
+            start, stop = df['InvoiceDate'].searchsorted([prev_from, prev_to], side='left')
+            prev_value = df['TotalAmount'].iloc[start:stop].sum()
             
             if prev_value > 0:
                 growth_percent = ((total_value - prev_value) / prev_value) * 100
@@ -628,7 +761,7 @@ def get_dashboard():
             growth_percent = 0
         
         # Average per week
-        weeks_in_range = len(df_filtered[date_col].dt.to_period('W').unique())
+        weeks_in_range = _count_weeks(df_filtered['InvoiceDate'])
         avg_per_week = total_value / weeks_in_range if weeks_in_range > 0 else 0
         
         # Transaction count
@@ -649,13 +782,16 @@ def get_dashboard():
                 'to': to_date
             }
 
-        print(f"\n{'='*80}")
-        print(f"✅ Dashboard data ready")
-        print(f"   Forecast: {forecast['totalForecast']:.2f} {metric_label}")
-        print(f"   Confidence: {forecast['accuracy']['confidence']}")
-        print(f"   Hash: {forecast_hash[:16]}...")
-        print(f"   TX Hash: {tx_hash[:16] if tx_hash != 'Unavailable' else 'Unavailable'}...")
-        print(f"{'='*80}\n")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('\n'.join([
+                '=' * 80,
+                "✅ Dashboard data ready",
+                f"   Forecast: {forecast['totalForecast']:.2f} {metric_label}",
+                f"   Confidence: {forecast['accuracy']['confidence']}",
+                f"   Hash: {forecast_hash[:16]}...",
+                f"   TX Hash: {tx_hash[:16]}...",
+                '=' * 80
+            ]))
         
         return jsonify({
             'success': True,
@@ -684,6 +820,180 @@ def get_dashboard():
         traceback.print_exc()
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
+# Fallback ABI if compilation fails at runtime
+FALLBACK_ABI = [{"inputs":[{"internalType":"string","name":"_forecastHash","type":"string"},{"internalType":"uint256","name":"_totalSales","type":"uint256"}],"name":"logForecast","outputs":[],"stateMutability":"nonpayable","type":"function"}]
+
+
+CONTRACT_SOURCE_FILE = 'ForecastLogger.sol'
+ABI_CACHE_FILE = 'ForecastLogger.abi.json'
+
+
+def _save_abi(abi):
+    """Persist a compiled ABI so later processes skip solc entirely"""
+    try:
+        tmp_path = f"{ABI_CACHE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(abi, f)
+        os.replace(tmp_path, ABI_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️  Could not write ABI cache: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def get_contract_abi():
+    """ForecastLogger ABI: read from the on-disk cache, compiling only when it is missing or stale"""
+    try:
+        if os.path.getmtime(ABI_CACHE_FILE) >= os.path.getmtime(CONTRACT_SOURCE_FILE):
+            with open(ABI_CACHE_FILE, 'r') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CONTRACT_SOURCE_FILE, 'r') as f: source = f.read()
+        import solcx
+        compiled = solcx.compile_source(source, output_values=['abi'])
+        contract_interface = list(compiled.items())[0][1]
+        _save_abi(contract_interface['abi'])
+        return contract_interface['abi']
+    except Exception as e:
+        print(f"⚠️  Using fallback ABI, compile failed: {e}")
+        return FALLBACK_ABI
+
+
+@functools.lru_cache(maxsize=8)
+def get_contract(address):
+    """Contract binding for a deployed ForecastLogger, reused across requests"""
+    return W3.eth.contract(address=address, abi=get_contract_abi())
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_account():
+    """First Ganache account, looked up once instead of per transaction"""
+    return W3.eth.accounts[0]
+
+
+# Deployed contract address, read from CONTRACT_ADDRESS_FILE (or deployed) once per process
+_contract_address = None
+_contract_address_lock = threading.Lock()
+
+
+def get_contract_address():
+    """ForecastLogger address, deploying the contract if no address file exists; None on failure"""
+    global _contract_address
+    with _contract_address_lock:
+        if _contract_address is None:
+            try:
+                with open(CONTRACT_ADDRESS_FILE, 'r') as f:
+                    _contract_address = f.read().strip() or None
+            except FileNotFoundError:
+                _contract_address = deploy_contract()
+        return _contract_address
+
+
+def _send_forecast_tx(forecast_hash, total_sales):
+    """Submit logForecast to Ganache and return the hex tx hash"""
+    if not W3.is_connected():
+        raise ConnectionError('Blockchain not connected')
+
+    # Get Contract
+    address = get_contract_address()
+    if not address:
+        raise RuntimeError('Contract not deployed')
+
+    contract = get_contract(address)
+
+    # Send Transaction
+    tx_hash = contract.functions.logForecast(forecast_hash, total_sales).transact({
+        'from': get_default_account()
+    })
+    return W3.to_hex(tx_hash)
+
+
+# ==========================================
+# ⛓️ BLOCKCHAIN TX QUEUE
+# ==========================================
+# Queued logs are sent one at a time by a background thread, so a request
+# with {"async": true} returns immediately instead of waiting on Ganache RPCs.
+# The thread starts on first use: threads started under gunicorn --preload
+# would not survive the fork into workers.
+TX_JOBS_KEEP = 256
+_tx_queue = queue.Queue()
+_tx_jobs = OrderedDict()
+_tx_lock = threading.Lock()
+_tx_worker = None
+
+
+def _drain_tx_queue():
+    while True:
+        job_id, forecast_hash, total_sales = _tx_queue.get()
+        try:
+            result = {'status': 'done', 'tx_hash': _send_forecast_tx(forecast_hash, total_sales)}
+        except Exception as e:
+            print(f"Blockchain Error: {e}")
+            result = {'status': 'failed', 'error': str(e)}
+        with _tx_lock:
+            if job_id in _tx_jobs:
+                _tx_jobs[job_id] = result
+        _tx_queue.task_done()
+
+
+def _enqueue_forecast_tx(forecast_hash, total_sales):
+    global _tx_worker
+    job_id = uuid.uuid4().hex
+    with _tx_lock:
+        if _tx_worker is None or not _tx_worker.is_alive():
+            _tx_worker = threading.Thread(target=_drain_tx_queue, name='blockchain-tx', daemon=True)
+            _tx_worker.start()
+        _tx_jobs[job_id] = {'status': 'pending'}
+        while len(_tx_jobs) > TX_JOBS_KEEP:
+            _tx_jobs.popitem(last=False)
+    _tx_queue.put((job_id, forecast_hash, total_sales))
+    return job_id
+
+
+# ==========================================
+# ⛓️ SUI LOGGING (background)
+# ==========================================
+# The dashboard no longer waits on the SUI RPC health check + submission.
+# Jobs are keyed by forecast hash, so refreshes of an unchanged forecast reuse
+# the in-flight or finished log instead of submitting it again; failed logs
+# are retried on the next request. Pool threads start on first submit, so
+# this is safe under gunicorn --preload.
+SUI_JOBS_KEEP = 256
+_sui_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sui-log')
+_sui_jobs = OrderedDict()
+_sui_lock = threading.Lock()
+
+
+def _log_to_sui(forecast, forecast_hash):
+    blockchain_result = log_forecast_to_sui(forecast, forecast['totalForecast'], forecast_hash=forecast_hash)
+    if blockchain_result['success']:
+        logger.info("✅ Forecast logged to blockchain successfully\n   Hash: %s...\n   TX: %s...",
+                    forecast_hash[:16], blockchain_result['tx_hash'][:16])
+    else:
+        logger.warning("⚠️  Blockchain logging failed: %s\n   Hash stored locally: %s...",
+                       blockchain_result['message'], forecast_hash[:16])
+    return blockchain_result
+
+
+def _sui_job_failed(job):
+    return job.done() and (job.exception() is not None or not job.result()['success'])
+
+
+def _submit_sui_log(forecast, forecast_hash):
+    """Future for the SUI log of this forecast, submitting it unless one is pending or succeeded"""
+    with _sui_lock:
+        job = _sui_jobs.get(forecast_hash)
+        if job is None or _sui_job_failed(job):
+            job = _sui_pool.submit(_log_to_sui, forecast, forecast_hash)
+            _sui_jobs[forecast_hash] = job
+        _sui_jobs.move_to_end(forecast_hash)
+        while len(_sui_jobs) > SUI_JOBS_KEEP:
+            _sui_jobs.popitem(last=False)
+    return job
+
+
 @app.route('/api/log-blockchain', methods=['POST'])
 def log_blockchain():
     try:
@@ -696,43 +1006,25 @@ def log_blockchain():
         
         if not forecast_hash:
             return jsonify({'success': False, 'error': 'Hash is required'}), 400
-            
-        # Connect to Ganache
-        w3 = Web3(Web3.HTTPProvider(GANACHE_URL))
-        if not w3.is_connected():
-            return jsonify({'success': False, 'error': 'Blockchain not connected'}), 503
-            
-        # Get Contract
-        address = None
-        if os.path.exists(CONTRACT_ADDRESS_FILE):
-            with open(CONTRACT_ADDRESS_FILE, 'r') as f:
-                address = f.read().strip()
-        else:
-            address = deploy_contract()
-            
-        if not address: return None
-        
-        # Compile to get ABI dynamically
+
+        if data.get('async'):
+            job_id = _enqueue_forecast_tx(forecast_hash, total_sales)
+            return jsonify({
+                'success': True,
+                'queued': True,
+                'job_id': job_id,
+                'tx_hash': 'Pending...',
+                'message': 'Queued for blockchain logging'
+            }), 202
+
         try:
-            with open('ForecastLogger.sol', 'r') as f: source = f.read()
-            import solcx
-            compiled = solcx.compile_source(source, output_values=['abi'])
-            contract_interface = list(compiled.items())[0][1]
-            abi = contract_interface['abi']
-        except:
-            # Fallback ABI if compilation fails at runtime
-            abi = [{"inputs":[{"internalType":"string","name":"_forecastHash","type":"string"},{"internalType":"uint256","name":"_totalSales","type":"uint256"}],"name":"logForecast","outputs":[],"stateMutability":"nonpayable","type":"function"}]
-        
-        contract = w3.eth.contract(address=address, abi=abi)
-        
-        # Send Transaction
-        tx_hash = contract.functions.logForecast(forecast_hash, total_sales).transact({
-            'from': w3.eth.accounts[0]
-        })
+            tx_hash = _send_forecast_tx(forecast_hash, total_sales)
+        except ConnectionError as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
         
         return jsonify({
             'success': True, 
-            'tx_hash': w3.to_hex(tx_hash),
+            'tx_hash': tx_hash,
             'message': 'Logged to blockchain'
         })
         
@@ -740,34 +1032,60 @@ def log_blockchain():
         print(f"Blockchain Error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+@app.route('/api/log-blockchain/<job_id>', methods=['GET'])
+def log_blockchain_status(job_id):
+    """Status of a queued blockchain log: pending, done (with tx_hash) or failed"""
+    with _tx_lock:
+        job = _tx_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job id'}), 404
+    return jsonify({'success': job['status'] != 'failed', 'job_id': job_id, **job})
+
+@app.route('/api/tx-status/<forecast_hash>', methods=['GET'])
+def sui_tx_status(forecast_hash):
+    """Outcome of the background SUI log started by /api/dashboard"""
+    with _sui_lock:
+        job = _sui_jobs.get(forecast_hash)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown forecast hash'}), 404
+    if not job.done():
+        return jsonify({'success': True, 'status': 'pending', 'hash': forecast_hash})
+    if job.exception() is not None:
+        return jsonify({'success': True, 'status': 'failed', 'hash': forecast_hash,
+                        'tx_hash': 'Unavailable', 'message': str(job.exception())})
+    result = job.result()
+    return jsonify({
+        'success': True,
+        'status': 'done' if result['success'] else 'failed',
+        'hash': forecast_hash,
+        'tx_hash': result.get('tx_hash', 'Unavailable'),
+        'message': result.get('message'),
+        'explorer_url': result.get('explorer_url')
+    })
+
 @app.route('/api/reconcile', methods=['GET'])
 def reconcile_data():
     """
     Reconciliation endpoint: Recompute totals from raw data and compare
     """
     try:
-        df = load_data()
-        if df is None:
-            return jsonify({'success': False, 'error': 'No data available'}), 400
-        
         # Get date range filter
         from_date = request.args.get('from')
         to_date = request.args.get('to')
         
-        # Apply same filter as dashboard
-        df_filtered = df.copy()
-        if from_date or to_date:
-            date_col = CURRENT_MAPPING.get('date', 'InvoiceDate')
-            if from_date:
-                from_dt = pd.to_datetime(from_date)
-                df_filtered = df_filtered[df_filtered[date_col] >= from_dt]
-            if to_date:
-                to_dt = pd.to_datetime(to_date)
-                df_filtered = df_filtered[df_filtered[date_col] <= to_dt]
-        
-        # Recompute total from raw data
-        value_col = CURRENT_MAPPING.get('value', 'Quantity')
-        actual_total = float(df_filtered[value_col].sum())
+        def filtered_rows():
+            df = load_data()
+            if df is None:
+                return None
+            # Apply same filter as dashboard (binary search on the date-sorted frame, no copy)
+            return slice_date_range(df, from_date, to_date)
+        
+        # Total for this range: the dashboard's KPI total if it was just computed,
+        # otherwise recomputed from the data (load_data renames the mapped value column)
+        actual_total = _cached_total(_data_fingerprint(), from_date, to_date, filtered_rows)
+        if actual_total is None:
+            return jsonify({'success': False, 'error': 'No data available'}), 400
         
         # Get displayed total from request (optional, for comparison)
         displayed_total = request.args.get('displayed_total', type=float)
@@ -832,11 +1150,10 @@ def remove_upload():
 
 def deploy_contract():
     try:
-        w3 = Web3(Web3.HTTPProvider(GANACHE_URL))
-        if not w3.is_connected(): return None
+        if not W3.is_connected(): return None
         
         # Compile
-        with open('ForecastLogger.sol', 'r') as f: source = f.read()
+        with open(CONTRACT_SOURCE_FILE, 'r') as f: source = f.read()
         import solcx
         
         # Install solc if needed
@@ -847,11 +1164,12 @@ def deploy_contract():
             
         compiled = solcx.compile_source(source, output_values=['abi', 'bin'])
         contract_interface = list(compiled.items())[0][1]
+        _save_abi(contract_interface['abi'])
         
         # Deploy
-        ForecastLogger = w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
-        tx_hash = ForecastLogger.constructor().transact({'from': w3.eth.accounts[0]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        ForecastLogger = W3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
+        tx_hash = ForecastLogger.constructor().transact({'from': get_default_account()})
+        tx_receipt = W3.eth.wait_for_transaction_receipt(tx_hash)
         
         # Save Address
         with open(CONTRACT_ADDRESS_FILE, 'w') as f:
@@ -865,6 +1183,7 @@ def deploy_contract():
 if __name__ == '__main__':
     # Don't load data on startup - wait for user to upload CSV
     # Only deploy if address file doesn't exist
-    if not os.path.exists(CONTRACT_ADDRESS_FILE):
-        deploy_contract()
-    app.run(debug=True, port=5000)
+    get_contract_address()
+    # Development server only; production runs gunicorn (see Procfile)
+    debug_mode = os.getenv('FLASK_ENV', 'development') == 'development'
+    app.run(debug=debug_mode, port=5000)
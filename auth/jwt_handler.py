@@ -1,7 +1,11 @@
 """
 Simple JWT handling for Production V1
 """
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
@@ -11,6 +15,22 @@ JWT_SECRET = os.getenv('JWT_SECRET', 'CHANGE-THIS-IN-PRODUCTION-USE-RANDOM-STRIN
 JWT_ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Built once and reused on every request: the codec, the secret as bytes (no
+# str -> bytes in key preparation per call) and the fixed decode arguments
+_jwt = jwt.PyJWT()
+_JWT_KEY = JWT_SECRET.encode('utf-8')
+_DECODE_ALGORITHMS = [JWT_ALGORITHM]
+_DECODE_OPTIONS = {'require': ['exp', 'iat']}
+
+# Recently verified tokens (by digest), so repeat requests skip signature
+# checking and payload parsing. Entries live at most TOKEN_CACHE_TTL seconds
+# and never past the token's own exp; tokens close to expiry aren't cached.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 50000
+TOKEN_CACHE_EXPIRY_MARGIN = 5
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 def create_access_token(user_id: str, wallet_address: str) -> str:
     """
     Create JWT access token
@@ -29,7 +49,7 @@ def create_access_token(user_id: str, wallet_address: str) -> str:
         'iat': datetime.utcnow()
     }
     
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    token = _jwt.encode(payload, _JWT_KEY, algorithm=JWT_ALGORITHM)
     return token
 
 
@@ -40,13 +60,31 @@ def decode_token(token: str) -> Optional[Dict]:
     Returns:
         Decoded payload or None if invalid
     """
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+    now = time.time()
+    with _token_cache_lock:
+        entry = _token_cache.get(digest)
+        if entry is not None:
+            if entry[0] > now:
+                _token_cache.move_to_end(digest)
+                return dict(entry[1])
+            del _token_cache[digest]
+    
     try:
-        payload = jwt.decode(
+        payload = _jwt.decode(
             token,
-            JWT_SECRET,
-            algorithms=[JWT_ALGORITHM]
+            _JWT_KEY,
+            algorithms=_DECODE_ALGORITHMS,
+            options=_DECODE_OPTIONS
         )
-        return payload
+        expires_at = min(now + TOKEN_CACHE_TTL, payload['exp'] - TOKEN_CACHE_EXPIRY_MARGIN)
+        if expires_at > now:
+            with _token_cache_lock:
+                _token_cache[digest] = (expires_at, payload)
+                _token_cache.move_to_end(digest)
+                while len(_token_cache) > TOKEN_CACHE_SIZE:
+                    _token_cache.popitem(last=False)
+        return dict(payload)
     except jwt.ExpiredSignatureError:
         print("Token expired")
         return None
@@ -1,12 +1,51 @@
 """
 Auth middleware for Production V1
 """
+from collections import OrderedDict, namedtuple
 from functools import wraps
+import threading
+import time
 from flask import request, jsonify, g
 from auth.jwt_handler import decode_token
 from database.models import User
 from database.connection import db_session
 
+# Active users by id, cached briefly so polling clients don't cost a SELECT
+# per request. Entries are plain snapshots: ORM instances expire on commit
+# and detach when the request's session is removed. A deactivated user is
+# locked out within ACTIVE_USER_CACHE_TTL seconds.
+ACTIVE_USER_CACHE_TTL = 60
+ACTIVE_USER_CACHE_SIZE = 10000
+CachedUser = namedtuple('CachedUser', ['id', 'wallet_address', 'display_name'])
+_active_users = OrderedDict()
+_active_users_lock = threading.Lock()
+
+
+def _get_active_user(user_id):
+    """CachedUser for an active user id, or None"""
+    now = time.monotonic()
+    with _active_users_lock:
+        entry = _active_users.get(user_id)
+        if entry is not None and entry[0] > now:
+            _active_users.move_to_end(user_id)
+            return entry[1]
+    
+    user = db_session.query(User).filter(
+        User.id == user_id,
+        User.is_active == True
+    ).first()
+    if not user:
+        return None
+    
+    cached = CachedUser(user.id, user.wallet_address, user.display_name)
+    with _active_users_lock:
+        _active_users[user_id] = (now + ACTIVE_USER_CACHE_TTL, cached)
+        _active_users.move_to_end(user_id)
+        while len(_active_users) > ACTIVE_USER_CACHE_SIZE:
+            _active_users.popitem(last=False)
+    return cached
+
+
 def require_auth(f):
     """
     Decorator to protect routes - requires valid JWT
@@ -33,11 +72,8 @@ def require_auth(f):
         if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
         
-        # Load user from database
-        user = db_session.query(User).filter(
-            User.id == payload['user_id'],
-            User.is_active == True
-        ).first()
+        # Load user (database at most once per TTL per user)
+        user = _get_active_user(payload['user_id'])
         
         if not user:
             return jsonify({'error': 'User not found or inactive'}), 401
@@ -46,6 +82,7 @@ def require_auth(f):
         g.user = user
         g.user_id = user.id
         g.wallet_address = user.wallet_address
+        g.rate_key = f"user_{user.id}"  # per-user rate limiting key
         
         return f(*args, **kwargs)
     
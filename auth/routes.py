@@ -4,6 +4,8 @@ Auth endpoints for Production V1
 from flask import Blueprint, request, jsonify, g
 from datetime import datetime, timedelta
 import secrets
+from sqlalchemy import literal_column, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from auth.jwt_handler import create_access_token
 from auth.middleware import require_auth
 from database.models import User, AuthNonce, AuditLog
@@ -13,6 +15,24 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 NONCE_EXPIRY_MINUTES = 5
 
+def purge_expired_nonces():
+    """Delete every expired nonce in one statement; returns the row count"""
+    deleted = db_session.query(AuthNonce).filter(
+        AuthNonce.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db_session.commit()
+    return deleted
+
+
+@auth_bp.cli.command('cleanup-nonces')
+def cleanup_nonces_command():
+    """
+    Purge expired login nonces (run from cron, e.g. every 5 minutes):
+        flask --app app_v2 auth cleanup-nonces
+    """
+    print(f"🧹 Deleted {purge_expired_nonces()} expired nonces")
+
+
 @auth_bp.route('/nonce', methods=['POST'])
 def get_nonce():
     """
@@ -37,13 +57,6 @@ def get_nonce():
         if not wallet_address or not wallet_address.startswith('0x'):
             return jsonify({'error': 'Invalid wallet address'}), 400
         
-        # Clean up old nonces for this wallet
-        db_session.query(AuthNonce).filter(
-            AuthNonce.wallet_address == wallet_address,
-            AuthNonce.expires_at < datetime.utcnow()
-        ).delete()
-        db_session.commit()
-        
         # Generate nonce
         nonce = secrets.token_urlsafe(32)
         expires_at = datetime.utcnow() + timedelta(minutes=NONCE_EXPIRY_MINUTES)
@@ -106,39 +119,56 @@ def verify_signature():
         if not all([wallet_address, signature, nonce]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Validate nonce
-        nonce_record = db_session.query(AuthNonce).filter(
-            AuthNonce.wallet_address == wallet_address,
-            AuthNonce.nonce == nonce,
-            AuthNonce.used == False,
-            AuthNonce.expires_at > datetime.utcnow()
-        ).first()
+        # Validate and consume the nonce in one atomic UPDATE ... RETURNING,
+        # so two concurrent verifies can't both see it unused
+        nonce_id = db_session.execute(
+            update(AuthNonce)
+            .where(
+                AuthNonce.wallet_address == wallet_address,
+                AuthNonce.nonce == nonce,
+                AuthNonce.used == False,
+                AuthNonce.expires_at > datetime.utcnow()
+            )
+            .values(used=True)
+            .returning(AuthNonce.id)
+        ).scalar_one_or_none()
         
-        if not nonce_record:
+        if nonce_id is None:
+            db_session.rollback()
             return jsonify({'error': 'Invalid or expired nonce'}), 401
         
-        # Mark nonce as used
-        nonce_record.used = True
-        db_session.commit()
-        
         # TODO: Verify signature with Sui SDK
         # For V1, we'll accept any signature (MUST FIX with real verification)
         # In production, use @mysten/sui.js to verify signature
         
-        # Find or create user
-        user = db_session.query(User).filter(
-            User.wallet_address == wallet_address
-        ).first()
-        
-        if not user:
-            # First-time login: create user
-            user = User(
+        # Find or create the user and stamp the login in one round trip;
+        # xmax is 0 only on a row this statement inserted
+        now = datetime.utcnow()
+        user = db_session.execute(
+            pg_insert(User)
+            .values(
                 wallet_address=wallet_address,
-                display_name=f"User-{wallet_address[:8]}"
+                display_name=f"User-{wallet_address[:8]}",
+                last_login_at=now
             )
-            db_session.add(user)
-            db_session.flush()
-            
+            .on_conflict_do_update(
+                index_elements=[User.wallet_address],
+                set_={'last_login_at': now}
+            )
+            .returning(
+                User.id,
+                User.wallet_address,
+                User.display_name,
+                literal_column('xmax = 0').label('created')
+            )
+        ).one()
+        
+        # Nonce consumption and the user row commit together
+        db_session.commit()
+        
+        # Audit rows are written by another connection, so only after the
+        # user row they reference is committed
+        if user.created:
             AuditLog.log(
                 user_id=user.id,
                 action='USER_CREATED',
@@ -146,10 +176,6 @@ def verify_signature():
                 ip_address=request.remote_addr
             )
         
-        # Update last login
-        user.last_login_at = datetime.utcnow()
-        db_session.commit()
-        
         # Generate JWT
         access_token = create_access_token(
             user_id=str(user.id),
@@ -250,14 +276,20 @@ def dev_login():
             User.wallet_address == dev_wallet
         ).first()
         
-        if not user:
+        created = user is None
+        if created:
             user = User(
                 wallet_address=dev_wallet,
                 display_name=f"Dev User ({username})"
             )
             db_session.add(user)
             db_session.flush()
-            
+        
+        # Update last login
+        user.last_login_at = datetime.utcnow()
+        db_session.commit()
+        
+        if created:
             AuditLog.log(
                 user_id=user.id,
                 action='DEV_USER_CREATED',
@@ -265,10 +297,6 @@ def dev_login():
                 ip_address=request.remote_addr
             )
         
-        # Update last login
-        user.last_login_at = datetime.utcnow()
-        db_session.commit()
-        
         # Generate JWT
         access_token = create_access_token(
             user_id=str(user.id),
@@ -1,7 +1,7 @@
-import pandas as pd
+from data_utils import read_csv_fast
 
 try:
-    df = pd.read_csv('online_retail_II.csv', encoding='ISO-8859-1', nrows=5)
+    df = read_csv_fast('online_retail_II.csv', nrows=5)
     print("Columns found:", df.columns.tolist())
 except Exception as e:
     print("Error reading CSV:", e)
@@ -3,25 +3,24 @@ CSV Validation Module
 """
 import pandas as pd
 
-class CSVValidationError(Exception):
-    """Custom exception for CSV validation errors"""
-    pass
+from data_utils import read_csv_fast
+from exceptions import CSVValidationError
 
 def validate_uploaded_csv(file_path):
     """
     Validate uploaded CSV file
     
     Args:
-        file_path: Path to CSV file
+        file_path: Path to CSV file (already saved to disk)
         
     Returns:
-        True if valid
+        The parsed DataFrame, so callers don't read the file a second time
         
     Raises:
         CSVValidationError: If validation fails
     """
     try:
-        df = pd.read_csv(file_path, encoding='ISO-8859-1')
+        df = read_csv_fast(file_path)
         
         if len(df) == 0:
             raise CSVValidationError("CSV file is empty")
@@ -29,8 +28,10 @@ def validate_uploaded_csv(file_path):
         if len(df.columns) < 2:
             raise CSVValidationError("CSV must have at least 2 columns")
         
-        return True
+        return df
         
+    except CSVValidationError:
+        raise
     except pd.errors.EmptyDataError:
         raise CSVValidationError("CSV file is empty")
     except Exception as e:
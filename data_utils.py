@@ -0,0 +1,228 @@
+"""
+Shared CSV Reading and DataFrame Helpers
+
+Used by both app.py and app_v2.py: the pyarrow CSV readers, the cleaned-frame
+helpers (Parquet sidecars, dtype shrinking, date-sorted slicing) and the
+dashboard aggregations that work on those frames.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Date layouts Arrow tries while parsing; anything else stays text for pd.to_datetime
+ARROW_TIMESTAMP_FORMATS = ['%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y']
+
+# Bytes that don't make a CSV line non-blank (pandas skips lines of only these)
+_BLANK_BYTES = b' \t\r\n'
+_NOT_BLANK = np.ones(256, dtype=bool)
+_NOT_BLANK[list(_BLANK_BYTES)] = False
+
+# "_" and "-" both become spaces in one translate pass
+_LABEL_SEPARATORS = str.maketrans("_-", "  ")
+
+
+# ==========================================
+# CSV readers
+# ==========================================
+
+def read_csv_fast(file_path, encoding='ISO-8859-1', nrows=None):
+    """
+    Parse a CSV with pandas' multithreaded pyarrow engine, falling back to
+    the C engine when pyarrow is missing, can't handle the file, or only a
+    few rows are wanted (the pyarrow engine doesn't support nrows)
+    """
+    if nrows is None:
+        try:
+            return pd.read_csv(file_path, encoding=encoding, engine='pyarrow')
+        except (ImportError, ValueError) as e:
+            print(f"⚠️  pyarrow CSV engine failed, using C engine: {e}")
+    return pd.read_csv(file_path, encoding=encoding, engine='c', nrows=nrows,
+                       low_memory=False, cache_dates=True)
+
+
+def read_csv_arrow(csv_path, encoding, usecols=None, column_types=None, strings_can_be_null=False):
+    """Multithreaded pyarrow CSV read (returns the Arrow table) that also parses common date layouts in C++"""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    # Memory-mapped source: blocks are sliced from the page cache instead of
+    # being copied through a buffered file reader
+    with pa.memory_map(csv_path, 'r') as source:
+        table = pa_csv.read_csv(
+            source,
+            # Large blocks: fewer chunks, and type inference sees more rows
+            read_options=pa_csv.ReadOptions(encoding=encoding, block_size=16 << 20),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=usecols,
+                column_types=column_types,
+                strings_can_be_null=strings_can_be_null,
+                timestamp_parsers=[pa_csv.ISO8601] + ARROW_TIMESTAMP_FORMATS
+            )
+        )
+    return table
+
+
+def read_csv_labels(csv_path, encoding='ISO-8859-1', usecols=None, label_columns=()):
+    """
+    read_csv_arrow into a DataFrame, falling back to pandas if pyarrow can't
+    handle the file. label_columns come back categorical straight from the
+    parser, without materializing a Python string per row first.
+    """
+    try:
+        import pyarrow as pa
+        column_types = {col: pa.dictionary(pa.int32(), pa.string()) for col in label_columns}
+        return read_csv_arrow(csv_path, encoding, usecols, column_types, strings_can_be_null=True).to_pandas()
+    except (ImportError, ValueError) as e:
+        # pyarrow missing, or a column it can't type consistently
+        print(f"⚠️  pyarrow CSV reader failed, using default parser: {e}")
+        return pd.read_csv(csv_path, encoding=encoding, usecols=usecols,
+                           dtype={col: 'category' for col in label_columns})
+
+
+class CsvRowCounter:
+    """
+    Counts data rows of a CSV fed in as raw byte chunks (e.g. while an upload
+    streams to disk), matching what pandas' C parser returns: line breaks
+    inside quoted fields don't end a record, blank or whitespace-only lines
+    are skipped, and the header record isn't counted.
+    """
+    
+    def __init__(self):
+        self.records = 0
+        self.in_quotes = False  # inside a quoted field at the end of the last chunk
+        self.pending = False    # the current (unterminated) record has content
+    
+    def feed(self, chunk):
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        breaks = np.flatnonzero(data == ord('\n'))
+        if self.in_quotes or b'"' in chunk:
+            # Quote parity before each byte ("" escapes toggle twice, so parity holds)
+            quotes = np.flatnonzero(data == ord('"'))
+            parity = quotes.searchsorted(breaks) + self.in_quotes
+            breaks = breaks[parity % 2 == 0]
+            self.in_quotes = bool((self.in_quotes + len(quotes)) % 2)
+        if not len(breaks):
+            self.pending = self.pending or bool(chunk.strip(_BLANK_BYTES))
+            return
+        
+        # A record has content if its first byte does; only the few that start
+        # blank (empty, CRLF-only or indented lines) are checked in full
+        starts = np.concatenate(([0], breaks[:-1] + 1))
+        has_content = np.zeros(len(breaks), dtype=bool)
+        nonempty = starts < breaks
+        has_content[nonempty] = _NOT_BLANK[data[starts[nonempty]]]
+        for i in np.flatnonzero(~has_content).tolist():
+            has_content[i] = bool(chunk[starts[i]:breaks[i]].strip(_BLANK_BYTES))
+        has_content[0] |= self.pending
+        
+        self.records += int(np.count_nonzero(has_content))
+        self.pending = bool(chunk[breaks[-1] + 1:].strip(_BLANK_BYTES))
+    
+    @property
+    def rows(self):
+        return max(self.records + self.pending - 1, 0)
+
+
+# ==========================================
+# Cleaned frames
+# ==========================================
+
+def parquet_cache_path(csv_path, mapping_key):
+    """Sidecar Parquet path for a cleaned CSV (one file per mapping)"""
+    mapping_digest = hashlib.sha256(str(mapping_key).encode('utf-8')).hexdigest()[:12]
+    return f"{csv_path}.{mapping_digest}.parquet"
+
+
+def categorize_columns(df, columns):
+    """Turn the given columns (when present) into categoricals, e.g. after a Parquet read"""
+    for col in columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def downcast_frame(df):
+    """Shrink cached columns: smallest lossless numeric dtype, category for repetitive text"""
+    for col in df.columns:
+        if col == 'InvoiceDate':
+            continue
+        series = df[col]
+        if col == 'TotalAmount':
+            # Whole-number amounts (quantities) shrink to the smallest int, which
+            # sums exactly; fractional amounts stay float64 so totals don't drift
+            with np.errstate(invalid='ignore'):  # probe casts of huge floats
+                df[col] = pd.to_numeric(series, downcast='integer')
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif pd.api.types.is_string_dtype(series.dtype) and series.nunique() < len(series) * 0.5:
+            df[col] = series.astype('category')
+    return df
+
+
+def sort_by_date(df):
+    """Order rows by InvoiceDate so date ranges can be sliced with searchsorted"""
+    if df['InvoiceDate'].is_monotonic_increasing:
+        return df
+    return df.sort_values('InvoiceDate', kind='stable').reset_index(drop=True)
+
+
+def available_years(df):
+    """Calendar years with at least one row, ascending (df must be date-sorted)"""
+    dates = df['InvoiceDate']
+    if dates.empty:
+        return []
+    first, last = dates.iloc[0].year, dates.iloc[-1].year
+    # One binary search per year boundary instead of a dt.year pass over every row
+    bounds = [pd.Timestamp(year=year, month=1, day=1, tz=dates.dt.tz) for year in range(first, last + 2)]
+    positions = dates.searchsorted(bounds, side='left')
+    return [year for year, lo, hi in zip(range(first, last + 1), positions[:-1], positions[1:]) if hi > lo]
+
+
+def slice_date_range(df, from_date=None, to_date=None):
+    """
+    Rows in the half-open range [from_date, to_date + 1 day), i.e. through the
+    whole of to_date rather than stopping at its midnight (df must be date-sorted)
+    """
+    dates = df['InvoiceDate']
+    start = dates.searchsorted(pd.to_datetime(from_date), side='left') if from_date else 0
+    stop = dates.searchsorted(pd.to_datetime(to_date) + pd.Timedelta(days=1), side='left') if to_date else len(df)
+    return df.iloc[start:stop]
+
+
+# ==========================================
+# Dashboard helpers
+# ==========================================
+
+def format_metric_label(column_name):
+    """Convert raw column name to a human-friendly label"""
+    if not column_name:
+        return "Metric"
+    return column_name.translate(_LABEL_SEPARATORS).strip().title() or "Metric"
+
+
+def top_totals(df, column, label, n=5):
+    """n largest TotalAmount sums per column value as [{label: ..., 'value': ...}]"""
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Sum straight over the category codes: one bincount instead of a
+        # hash groupby. Codes with no rows in this slice are dropped, like
+        # observed=True.
+        codes = series.cat.codes.to_numpy()
+        present = codes >= 0
+        amounts = df['TotalAmount'].to_numpy()[present]
+        codes = codes[present]
+        size = len(series.cat.categories)
+        totals = np.bincount(codes, weights=np.nan_to_num(amounts.astype(np.float64)), minlength=size)
+        if amounts.dtype.kind in 'iu':
+            totals = totals.astype(np.int64)
+        observed = np.bincount(codes, minlength=size) > 0
+        totals = pd.Series(totals[observed], index=series.cat.categories[observed]).nlargest(n)
+    else:
+        totals = df.groupby(column, sort=False, observed=True)['TotalAmount'].sum().nlargest(n)
+    return [
+        {label: key, 'value': round(value, 2)}
+        for key, value in zip(totals.index.tolist(), totals.tolist())
+    ]
@@ -3,18 +3,33 @@ Simple PostgreSQL connection for Production V1
 """
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 
 # Load from environment
 DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/ml_analytics')
 
+# Pool per process: size it for gunicorn --threads plus the background
+# audit/warm-up threads, so request threads don't queue on a checkout
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a connection
+
+# psycopg2: multi-row VALUES for bulk INSERTs (the audit writer) and
+# execute_batch for executemany UPDATE/DELETE, instead of one round trip per row
+engine_options = {}
+if make_url(DATABASE_URL).get_driver_name() == 'psycopg2':
+    engine_options['executemany_mode'] = 'values_plus_batch'
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True  # Verify connections before use
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,  # Verify connections before use
+    **engine_options
 )
 
 # Session factory
@@ -1,10 +1,14 @@
 """
 SQLAlchemy models for Production V1
 """
-from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
-from database.connection import Base
+from database.connection import Base, engine
+import atexit
+import queue
+import threading
+import time
 import uuid
 
 class User(Base):
@@ -32,13 +36,18 @@ class Upload(Base):
     __tablename__ = 'uploads'
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     original_filename = Column(String(500), nullable=False)
     storage_path = Column(Text, nullable=False)
     file_size_bytes = Column(BigInteger)
     column_mapping = Column(JSONB)
     row_count = Column(Integer)
     created_at = Column(DateTime, server_default=func.now(), index=True)
+    
+    # Latest upload per user is one index probe (same index as init_db.sql)
+    __table_args__ = (
+        Index('idx_uploads_user', user_id, created_at.desc()),
+    )
 
 class Forecast(Base):
     __tablename__ = 'forecasts'
@@ -57,20 +66,74 @@ class AuditLog(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='SET NULL'))
     action = Column(String(100), nullable=False, index=True)
-    metadata = Column(JSONB)
+    meta = Column('metadata', JSONB)  # 'metadata' is reserved on declarative classes
     ip_address = Column(String(45))
     created_at = Column(DateTime, server_default=func.now(), index=True)
     
     @classmethod
     def log(cls, user_id, action, metadata=None, ip_address=None):
-        """Helper to create audit log entry"""
-        from database.connection import db_session
-        log = cls(
-            user_id=user_id,
-            action=action,
-            metadata=metadata,
-            ip_address=ip_address
-        )
-        db_session.add(log)
-        db_session.commit()
-        return log
+        """Queue an audit log entry; a background thread inserts it in bulk"""
+        _start_audit_writer()
+        _audit_queue.put({
+            'user_id': user_id,
+            'action': action,
+            'metadata': metadata,
+            'ip_address': ip_address
+        })
+
+
+# ==========================================
+# Background audit writer
+# ==========================================
+# Requests only enqueue audit rows. One daemon thread per process drains the
+# queue every AUDIT_FLUSH_INTERVAL seconds and writes everything pending as a
+# single multi-row INSERT in its own transaction, so audit writes never hold
+# up a response or share its transaction. Whatever is still queued at exit is
+# flushed by an atexit hook.
+AUDIT_FLUSH_INTERVAL = 0.1  # seconds
+AUDIT_BATCH_SIZE = 500
+_audit_queue = queue.Queue()
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+
+def _flush_audit_batch():
+    """Insert up to AUDIT_BATCH_SIZE queued rows; returns how many were taken"""
+    rows = []
+    while len(rows) < AUDIT_BATCH_SIZE:
+        try:
+            rows.append(_audit_queue.get_nowait())
+        except queue.Empty:
+            break
+    if rows:
+        try:
+            with engine.begin() as conn:
+                conn.execute(AuditLog.__table__.insert(), rows)
+        except Exception as e:
+            print(f"⚠️  Dropped {len(rows)} audit log entries: {e}")
+    return len(rows)
+
+
+def _run_audit_writer():
+    while True:
+        time.sleep(AUDIT_FLUSH_INTERVAL)
+        while _flush_audit_batch() == AUDIT_BATCH_SIZE:
+            pass
+
+
+def _start_audit_writer():
+    """Start the writer thread on first use (also after a fork, which drops threads)"""
+    global _audit_writer
+    if _audit_writer is not None and _audit_writer.is_alive():
+        return
+    with _audit_writer_lock:
+        if _audit_writer is None or not _audit_writer.is_alive():
+            _audit_writer = threading.Thread(target=_run_audit_writer, name='audit-writer', daemon=True)
+            _audit_writer.start()
+
+
+@atexit.register
+def flush_audit_log():
+    """Write every queued audit entry now"""
+    while _flush_audit_batch():
+        pass
@@ -5,6 +5,41 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# Date/number probing parses at most this many non-null values per text column
+DETECTION_SAMPLE_SIZE = 200
+# Share of sampled values that must parse for a column to count as a date
+DATE_PARSE_THRESHOLD = 0.8
+
+
+def _date_parse_ratio(series):
+    """Share of a column's first DETECTION_SAMPLE_SIZE non-null values that parse as dates"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 1.0
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return 0.0  # numbers, booleans, categoricals
+    sample = series.dropna().iloc[:DETECTION_SAMPLE_SIZE]
+    if sample.empty:
+        return 0.0
+    parsed = pd.to_datetime(sample.astype(str), errors='coerce', format='mixed')
+    return parsed.notna().mean()
+
+
+def _numeric_ratio(series, non_null_ratio):
+    """
+    Share of a column's cells holding numbers. Typed numeric columns are
+    answered from the dtype; text columns from a parsed sample of their
+    non-null values, scaled by the column's non-null share.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return non_null_ratio
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return 0.0  # datetimes, categoricals
+    sample = series.dropna().iloc[:DETECTION_SAMPLE_SIZE]
+    if sample.empty:
+        return 0.0
+    return pd.to_numeric(sample, errors='coerce').notna().mean() * non_null_ratio
+
+
 def detect_fields(df):
     """
     Auto-detect date, value, and optional fields in CSV
@@ -24,21 +59,20 @@ def detect_fields(df):
     }
     warnings = []
     
-    # Detect date column
+    # Non-null share of every column, counted in one call
+    non_null_ratios = df.count() / len(df)
+    
+    # Detect date column: only text columns can hold unparsed dates, and a
+    # sample of their values is enough to tell (parsing whole columns was the
+    # dominant cost here)
     date_candidates = []
     for col in df.columns:
-        try:
-            # Try parsing as date
-            pd.to_datetime(df[col], errors='coerce')
-            non_null_ratio = df[col].notna().sum() / len(df)
-            if non_null_ratio > 0.5:
-                # Check if values look like dates
-                if any(keyword in col.lower() for keyword in ['date', 'time', 'day', 'invoice']):
-                    date_candidates.append((col, 10))  # High priority
-                else:
-                    date_candidates.append((col, 5))  # Medium priority
-        except:
-            pass
+        if non_null_ratios[col] <= 0.5 or _date_parse_ratio(df[col]) <= DATE_PARSE_THRESHOLD:
+            continue
+        if any(keyword in col.lower() for keyword in ['date', 'time', 'day', 'invoice']):
+            date_candidates.append((col, 10))  # High priority
+        else:
+            date_candidates.append((col, 5))  # Medium priority
     
     if date_candidates:
         date_candidates.sort(key=lambda x: x[1], reverse=True)
@@ -49,21 +83,16 @@ def detect_fields(df):
     for col in df.columns:
         if col == mapping['date']:
             continue
-        try:
-            numeric_data = pd.to_numeric(df[col], errors='coerce')
-            non_null_ratio = numeric_data.notna().sum() / len(df)
-            if non_null_ratio > 0.5:
-                # Prioritize columns with keywords
-                priority = 0
-                if any(keyword in col.lower() for keyword in ['amount', 'total', 'price', 'revenue', 'sales', 'value']):
-                    priority = 10
-                elif any(keyword in col.lower() for keyword in ['quantity', 'qty', 'count']):
-                    priority = 7
-                else:
-                    priority = 5
-                value_candidates.append((col, priority))
-        except:
-            pass
+        if _numeric_ratio(df[col], non_null_ratios[col]) > 0.5:
+            # Prioritize columns with keywords
+            priority = 0
+            if any(keyword in col.lower() for keyword in ['amount', 'total', 'price', 'revenue', 'sales', 'value']):
+                priority = 10
+            elif any(keyword in col.lower() for keyword in ['quantity', 'qty', 'count']):
+                priority = 7
+            else:
+                priority = 5
+            value_candidates.append((col, priority))
     
     if value_candidates:
         value_candidates.sort(key=lambda x: x[1], reverse=True)
@@ -122,16 +151,19 @@ def validate_and_clean_data(df, mapping):
     Returns:
         Cleaned DataFrame
     """
-    df_clean = df.copy()
+    converted = {}
     
     # Convert date column
     if mapping.get('date'):
-        df_clean[mapping['date']] = pd.to_datetime(df_clean[mapping['date']], errors='coerce')
-        df_clean = df_clean.dropna(subset=[mapping['date']])
+        converted[mapping['date']] = pd.to_datetime(df[mapping['date']], errors='coerce')
     
     # Convert value column to numeric
     if mapping.get('value'):
-        df_clean[mapping['value']] = pd.to_numeric(df_clean[mapping['value']], errors='coerce')
-        df_clean = df_clean.dropna(subset=[mapping['value']])
+        converted[mapping['value']] = pd.to_numeric(df[mapping['value']], errors='coerce')
+    
+    # Drop unparseable rows with one mask and build the result in a single pass
+    keep = np.ones(len(df), dtype=bool)
+    for column in converted.values():
+        keep &= column.notna().to_numpy()
     
-    return df_clean
+    return df.loc[keep].assign(**{name: column[keep] for name, column in converted.items()})
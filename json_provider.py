@@ -0,0 +1,30 @@
+"""
+orjson-backed JSON provider for Flask
+
+Drop-in replacement for Flask's DefaultJSONProvider: jsonify() and
+app.json.dumps() serialize with orjson (Rust) instead of the stdlib encoder.
+Output keeps Flask's sorted keys; numpy scalars/arrays are serialized natively
+and anything orjson doesn't know (dates, Decimal, UUID, ...) falls back to the
+default provider's conversions.
+
+Usage:
+    app.json = OrjsonProvider(app)
+"""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson"""
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response (no str round trip)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -11,11 +11,14 @@ This module provides production-ready forecasting with:
 
 import pandas as pd
 import numpy as np
-from datetime import timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+import hashlib
+import json
 import logging
+import os
 import warnings
 import signal
+import threading
 from functools import wraps
 
 # Suppress timezone and other warnings
@@ -86,6 +89,11 @@ class ForecastConfig:
     
     # Negative values handling
     RETURNS_HANDLING = "include_as_negative"  # Options: "include_as_negative", "absolute", "subtract"
+    
+    # On-disk cache for fitted ARIMA models (keyed by series content + params),
+    # pruned to the most recently used entries after each write
+    MODEL_CACHE_DIR = os.getenv('FORECAST_MODEL_CACHE_DIR', '.forecast_cache')
+    MODEL_CACHE_MAX_FILES = int(os.getenv('FORECAST_MODEL_CACHE_MAX_FILES', '256'))
 
 
 def detect_and_handle_anomalies(series: pd.Series, method: str = "zscore") -> Tuple[pd.Series, List[int]]:
@@ -133,6 +141,30 @@ def detect_and_handle_anomalies(series: pd.Series, method: str = "zscore") -> Tu
     return cleaned, anomaly_indices
 
 
+def _weekly_sums(dates: pd.Series, values: pd.Series) -> pd.DataFrame:
+    """
+    Same bins as resample('W').sum(): weeks end on Sunday, each labelled by
+    that Sunday, empty weeks included as 0. Computed with one bincount over
+    integer day numbers instead of pandas' offset-based resampler.
+    """
+    if isinstance(dates.dtype, pd.DatetimeTZDtype) or len(dates) == 0:
+        # Weeks of tz-aware data are local-time weeks: keep pandas' resampler
+        weekly = pd.Series(values.to_numpy(), index=pd.DatetimeIndex(dates)).resample('W').sum().reset_index()
+        weekly.columns = ['date', 'value']
+        return weekly
+
+    days = dates.to_numpy().astype('datetime64[D]').view('i8')
+    # 1970-01-01 was a Thursday (weekday 3); push each day to its week's Sunday
+    week_end = days + (6 - (days + 3) % 7)
+    first = week_end.min()
+    sums = np.bincount(
+        (week_end - first) // 7,
+        weights=np.nan_to_num(values.to_numpy(dtype=np.float64))
+    )
+    week_dates = (first + 7 * np.arange(len(sums))).astype('datetime64[D]').astype('datetime64[ns]')
+    return pd.DataFrame({'date': week_dates, 'value': sums})
+
+
 def prepare_weekly_series(df: pd.DataFrame, date_col: str = 'InvoiceDate', 
                          value_col: str = 'TotalAmount') -> pd.DataFrame:
     """
@@ -147,8 +179,7 @@ def prepare_weekly_series(df: pd.DataFrame, date_col: str = 'InvoiceDate',
         DataFrame with weekly aggregated data
     """
     # Aggregate to weekly series
-    weekly = df.set_index(date_col)[value_col].resample('W').sum().reset_index()
-    weekly.columns = ['date', 'value']
+    weekly = _weekly_sums(df[date_col], df[value_col])
     
     # Handle negative values based on config
     if ForecastConfig.RETURNS_HANDLING == "absolute":
@@ -217,6 +248,21 @@ def calculate_accuracy_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict:
     }
 
 
+def _linear_trend(y: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Least-squares line on the week index (0..n-1), extrapolated for the next
+    `horizon` weeks. Closed form of sklearn's LinearRegression for one feature.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(len(y), dtype=np.float64)
+    x_mean = x.mean()
+    y_mean = y.mean()
+    sxx = np.dot(x - x_mean, x - x_mean)
+    slope = np.dot(x - x_mean, y - y_mean) / sxx if sxx > 0 else 0.0
+    intercept = y_mean - slope * x_mean
+    return intercept + slope * np.arange(len(y), len(y) + horizon, dtype=np.float64)
+
+
 def rolling_origin_backtest(series: pd.Series, horizon: int, min_train_size: int) -> Optional[Dict]:
     """
     Perform rolling-origin backtesting to compute robust accuracy metrics
@@ -256,16 +302,7 @@ def rolling_origin_backtest(series: pd.Series, horizon: int, min_train_size: int
             break
         
         # Simple baseline for backtesting: linear trend on week index
-        X_train = np.arange(len(train)).reshape(-1, 1)
-        y_train = train.values
-        
-        from sklearn.linear_model import LinearRegression
-        model = LinearRegression()
-        model.fit(X_train, y_train)
-        
-        # Predict test period
-        X_test = np.arange(len(train), len(train) + len(test)).reshape(-1, 1)
-        predictions = model.predict(X_test)
+        predictions = _linear_trend(train.values, len(test))
         
         all_actuals.extend(test.values)
         all_predictions.extend(predictions)
@@ -282,6 +319,68 @@ def rolling_origin_backtest(series: pd.Series, horizon: int, min_train_size: int
     return metrics
 
 
+def _model_cache_path(values: np.ndarray, params: Dict) -> str:
+    """
+    Build the cache file path for a fitted model (or its forecast)
+    
+    The key is a SHA-256 of the training values plus the fit parameters, so
+    any change to the series or the model search space misses the cache.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return os.path.join(ForecastConfig.MODEL_CACHE_DIR, f"arima_{digest.hexdigest()}.joblib")
+
+
+def _load_cached_model(cache_path: str) -> Optional[Any]:
+    """Load a previously fitted model from disk, or None on a miss"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        import joblib
+        model = joblib.load(cache_path)
+        os.utime(cache_path)  # mtime = last use, for LRU pruning
+        return model
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable model cache {cache_path}: {e}")
+        return None
+
+
+def _prune_model_cache() -> None:
+    """Delete the least recently used cache files beyond MODEL_CACHE_MAX_FILES"""
+    entries = []
+    with os.scandir(ForecastConfig.MODEL_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.joblib'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass  # pruned by another worker
+    excess = len(entries) - ForecastConfig.MODEL_CACHE_MAX_FILES
+    if excess <= 0:
+        return
+    entries.sort()
+    for _, path in entries[:excess]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _store_cached_model(cache_path: str, model: Any) -> None:
+    """Persist a fitted model atomically (write to temp file, then rename)"""
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        import joblib
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, cache_path)
+        _prune_model_cache()
+    except Exception as e:
+        logger.warning(f"Could not write model cache {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def fit_prophet_model(weekly_df: pd.DataFrame, horizon: int) -> Tuple[List[float], List[float], List[float]]:
     """
     Fit Prophet model for time series forecasting
@@ -340,10 +439,93 @@ def fit_prophet_model(weekly_df: pd.DataFrame, horizon: int) -> Tuple[List[float
         raise
 
 
+def _forecast_statsforecast_arima(values: np.ndarray, horizon: int, seasonal: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit statsforecast's AutoARIMA (Numba-compiled, cached on disk) and forecast
+    with an 85% interval
+    
+    Raises:
+        ImportError: If statsforecast is not installed
+    """
+    from statsforecast.models import AutoARIMA
+    
+    arima_params = {
+        'season_length': 52 if seasonal else 1,  # 52 weeks in a year
+        'max_p': 3, 'max_q': 3,
+        'max_P': 2, 'max_Q': 2
+    }
+    
+    # Reuse a previous fit of the exact same series when available; the fit
+    # doesn't depend on the horizon, so every horizon shares one cache entry
+    cache_path = _model_cache_path(values, {'engine': 'statsforecast', **arima_params})
+    model = _load_cached_model(cache_path)
+    
+    if model is None:
+        model = AutoARIMA(**arima_params).fit(y=np.asarray(values, dtype=np.float64))
+        _store_cached_model(cache_path, model)
+    else:
+        logger.info("Reusing cached ARIMA fit")
+    
+    result = model.predict(h=horizon, level=[85])
+    return result['mean'], result['lo-85'], result['hi-85']
+
+
+def _forecast_pmdarima(values: np.ndarray, horizon: int, seasonal: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit pmdarima's auto_arima (cached on disk) and forecast with an 85% interval
+    
+    Raises:
+        ImportError: If pmdarima is not installed
+    """
+    from pmdarima import auto_arima
+    
+    arima_params = {
+        'seasonal': seasonal,
+        'm': 52 if seasonal else 1,  # 52 weeks in a year
+        'stepwise': True,
+        'max_p': 3, 'max_q': 3,
+        'max_P': 2, 'max_Q': 2
+    }
+    
+    # Reuse a previous fit of the exact same series when available
+    cache_path = _model_cache_path(values, arima_params)
+    model = _load_cached_model(cache_path)
+    
+    if model is None:
+        # Fit auto ARIMA
+        model = auto_arima(
+            values,
+            suppress_warnings=True,
+            error_action='ignore',
+            **arima_params
+        )
+        _store_cached_model(cache_path, model)
+    else:
+        logger.info("Reusing cached ARIMA fit")
+    
+    # Forecast
+    forecast_result = model.predict(n_periods=horizon, return_conf_int=True, alpha=0.15)
+    
+    if isinstance(forecast_result, tuple):
+        predictions, conf_int = forecast_result
+        lower = conf_int[:, 0]
+        upper = conf_int[:, 1]
+    else:
+        predictions = forecast_result
+        # Manual confidence interval
+        std_dev = np.std(values)
+        lower = predictions - 1.5 * std_dev
+        upper = predictions + 1.5 * std_dev
+    
+    return predictions, lower, upper
+
+
 def fit_arima_model(weekly_df: pd.DataFrame, horizon: int, seasonal: bool = False) -> Tuple[List[float], List[float], List[float]]:
     """
     Fit ARIMA/SARIMAX model
     
+    Uses statsforecast's AutoARIMA when installed and falls back to pmdarima.
+    
     Args:
         weekly_df: Weekly data with 'date' and 'value' columns
         horizon: Forecast horizon in weeks
@@ -352,45 +534,27 @@ def fit_arima_model(weekly_df: pd.DataFrame, horizon: int, seasonal: bool = Fals
     Returns:
         Tuple of (predictions, lower_bounds, upper_bounds)
     """
+    values = weekly_df['value'].values
+    
     try:
-        from pmdarima import auto_arima
-        
-        # Fit auto ARIMA
-        model = auto_arima(
-            weekly_df['value'].values,
-            seasonal=seasonal,
-            m=52 if seasonal else 1,  # 52 weeks in a year
-            suppress_warnings=True,
-            stepwise=True,
-            max_p=3, max_q=3,
-            max_P=2, max_Q=2,
-            error_action='ignore'
-        )
-        
-        # Forecast
-        forecast_result = model.predict(n_periods=horizon, return_conf_int=True, alpha=0.15)
-        
-        if isinstance(forecast_result, tuple):
-            predictions, conf_int = forecast_result
-            lower = conf_int[:, 0]
-            upper = conf_int[:, 1]
-        else:
-            predictions = forecast_result
-            # Manual confidence interval
-            std_dev = np.std(weekly_df['value'].values)
-            lower = predictions - 1.5 * std_dev
-            upper = predictions + 1.5 * std_dev
+        try:
+            predictions, lower, upper = _forecast_statsforecast_arima(values, horizon, seasonal)
+            engine = "statsforecast"
+        except ImportError:
+            logger.info("statsforecast not available, using pmdarima")
+            predictions, lower, upper = _forecast_pmdarima(values, horizon, seasonal)
+            engine = "pmdarima"
         
         # Ensure non-negative
         predictions = np.maximum(predictions, 0)
         lower = np.maximum(lower, 0)
         upper = np.maximum(upper, 0)
         
-        logger.info(f"{'Seasonal ' if seasonal else ''}ARIMA model fitted successfully")
+        logger.info(f"{'Seasonal ' if seasonal else ''}ARIMA model fitted successfully ({engine})")
         return predictions.tolist(), lower.tolist(), upper.tolist()
         
     except ImportError:
-        logger.warning("pmdarima not available")
+        logger.warning("Neither statsforecast nor pmdarima is available")
         raise
     except Exception as e:
         logger.error(f"ARIMA fitting failed: {e}")
@@ -408,19 +572,10 @@ def fit_baseline_model(weekly_df: pd.DataFrame, horizon: int) -> Tuple[List[floa
     Returns:
         Tuple of (predictions, lower_bounds, upper_bounds)
     """
-    from sklearn.linear_model import LinearRegression
-    
-    # Prepare data
-    X = np.arange(len(weekly_df)).reshape(-1, 1)
     y = weekly_df['value'].values
     
-    # Fit model
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Predict
-    future_X = np.arange(len(weekly_df), len(weekly_df) + horizon).reshape(-1, 1)
-    predictions = model.predict(future_X)
+    # Fit and predict (closed-form least squares on the week index)
+    predictions = _linear_trend(y, horizon)
     
     # Simple confidence bands based on historical std
     std_dev = np.std(y)
@@ -602,7 +757,8 @@ def generate_ml_forecast(df: pd.DataFrame, horizon: int = 4) -> Dict:
         
         # 5. Format output for API compatibility
         last_date = weekly_df['date'].max()
-        last_actual_value = weekly_df[weekly_df['value'] > 0]['value'].iloc[-1] if len(weekly_df[weekly_df['value'] > 0]) > 0 else 0
+        weekly_positive = weekly_df[weekly_df['value'] > 0]
+        last_actual_value = weekly_positive['value'].iloc[-1] if len(weekly_positive) > 0 else 0
         
         # Format forecast array
         forecast = []
@@ -615,32 +771,27 @@ def generate_ml_forecast(df: pd.DataFrame, horizon: int = 4) -> Dict:
             'upper': round(float(last_actual_value), 2)
         })
         
-        # Add predictions
-        for i in range(len(predictions)):
-            date = last_date + timedelta(weeks=i+1)
-            
-            # Optional: Christmas boost (if needed, keep existing logic)
-            pred = predictions[i]
-            if date.month == 12 and 18 <= date.day <= 31:
-                pred *= 1.15  # Reduced from 1.4 to be more conservative
-                lower_bounds[i] *= 1.15
-                upper_bounds[i] *= 1.15
-            
-            forecast.append({
-                'week': date.strftime('%d %b'),
-                'sales': round(float(pred), 2),
-                'lower': round(float(lower_bounds[i]), 2),
-                'upper': round(float(upper_bounds[i]), 2)
-            })
+        # Add predictions (vectorized over the whole horizon)
+        future_dates = last_date + pd.to_timedelta(np.arange(1, len(predictions) + 1) * 7, unit='D')
+
+        # Optional: Christmas boost for weeks landing on Dec 18-31
+        christmas = (future_dates.month == 12) & (future_dates.day >= 18)
+        boost = np.where(christmas, 1.15, 1.0)  # Reduced from 1.4 to be more conservative
+
+        future = pd.DataFrame({
+            'week': future_dates.strftime('%d %b'),
+            'sales': np.asarray(predictions, dtype=np.float64) * boost,
+            'lower': np.asarray(lower_bounds, dtype=np.float64) * boost,
+            'upper': np.asarray(upper_bounds, dtype=np.float64) * boost
+        }).round(2)
+        forecast.extend(future.to_dict('records'))
         
         # Format historical data (last 8 weeks)
-        historical = []
-        historical_data = weekly_df[weekly_df['value'] > 0].tail(8)
-        for _, row in historical_data.iterrows():
-            historical.append({
-                'date': row['date'].strftime('%d %b'),
-                'sales': round(float(row['value']), 2)
-            })
+        historical_data = weekly_positive.tail(8)
+        historical = pd.DataFrame({
+            'date': historical_data['date'].dt.strftime('%d %b'),
+            'sales': historical_data['value'].to_numpy(dtype=np.float64)
+        }).round(2).to_dict('records')
         
         # Calculate total forecast
         total_forecast = sum([f['sales'] for f in forecast])
@@ -21,6 +21,11 @@ import time
 
 logger = logging.getLogger(__name__)
 
+# Canonical encoder for forecast hashing, built once instead of per json.dumps call.
+# ensure_ascii (the default) keeps the output ASCII, so the digest matches the
+# previous json.dumps(...).encode('utf-8') form byte for byte.
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
 
 class SUIBlockchainAdapter:
     """
@@ -65,9 +70,9 @@ class SUIBlockchainAdapter:
         Returns:
             Hexadecimal hash string
         """
-        # Serialize forecast data consistently
-        serialized = json.dumps(forecast_data, sort_keys=True, separators=(',', ':'))
-        hash_object = hashlib.sha256(serialized.encode('utf-8'))
+        # Serialize forecast data consistently (C encoder, single pass)
+        serialized = _CANONICAL_ENCODER.encode(forecast_data)
+        hash_object = hashlib.sha256(serialized.encode('ascii'))
         forecast_hash = hash_object.hexdigest()
         
         logger.info(f"Generated forecast hash: {forecast_hash[:16]}...")
@@ -237,13 +242,16 @@ def get_sui_adapter() -> SUIBlockchainAdapter:
     return _sui_adapter_instance
 
 
-def log_forecast_to_sui(forecast_data: Dict, total_forecast: float) -> Dict:
+def log_forecast_to_sui(forecast_data: Dict, total_forecast: float,
+                        forecast_hash: Optional[str] = None) -> Dict:
     """
     Convenience function to log forecast to SUI blockchain
     
     Args:
         forecast_data: Forecast dictionary (historical, forecast, accuracy)
         total_forecast: Total forecast value
+        forecast_hash: Precomputed generate_forecast_hash(forecast_data), if
+            the caller already has it (skips re-serializing the forecast)
     
     Returns:
         Dictionary with tx_hash and status
@@ -251,7 +259,8 @@ def log_forecast_to_sui(forecast_data: Dict, total_forecast: float) -> Dict:
     adapter = get_sui_adapter()
     
     # Generate hash
-    forecast_hash = adapter.generate_forecast_hash(forecast_data)
+    if forecast_hash is None:
+        forecast_hash = adapter.generate_forecast_hash(forecast_data)
     
     # Log to chain
     result = adapter.log_forecast_to_chain(